@@ -1,123 +1,221 @@
+import json
 import os
 import re
 import yt_dlp
 import streamlit as st
-from urllib.parse import urlparse, parse_qs
 import time
 
+# Created once at import time; main() reruns on every widget interaction
+# and shouldn't pay a makedirs syscall each time
+_DOWNLOADS_DIR = os.path.join(os.getcwd(), "downloads")
+os.makedirs(_DOWNLOADS_DIR, exist_ok=True)
+
+# Matches watch and short-link YouTube URLs, capturing the 11-char video ID
+# in a single scan — no urlparse/parse_qs intermediate allocations
+_YT_ID = re.compile(
+    r'^https?://(?:www\.)?'
+    r'(?:youtube\.com/watch\?(?:[^&]*&)*v=([\w-]{11})(?![\w-])'
+    r'|youtu\.be/([\w-]{11})(?![\w-]))'
+)
+
 def is_valid_youtube_url(url):
     """Validate YouTube URL and extract video ID."""
-    try:
-        # Check if URL is valid
-        parsed_url = urlparse(url)
-        if parsed_url.netloc not in ['www.youtube.com', 'youtube.com', 'youtu.be']:
-            return None
-
-        # Extract video ID based on URL format
-        if parsed_url.netloc == 'youtu.be':
-            return parsed_url.path[1:]
-        
-        if parsed_url.path == '/watch':
-            return parse_qs(parsed_url.query).get('v', [None])[0]
-            
-        return None
-    except:
-        return None
+    m = _YT_ID.match(url)
+    return (m.group(1) or m.group(2)) if m else None
+
+_UNITS = ('B', 'KB', 'MB', 'GB')
 
 def format_size(bytes):
     """Convert bytes to human readable format."""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if bytes < 1024:
-            return f"{bytes:.2f} {unit}"
-        bytes /= 1024
-    return f"{bytes:.2f} GB"
+    n = int(bytes)
+    if n <= 0:
+        return "0.00 B"
+    # Pick the unit from the bit length: one divide, no loop
+    i = min((n.bit_length() - 1) // 10, len(_UNITS) - 1)
+    return f"{n / (1 << (10 * i)):.2f} {_UNITS[i]}"
+
+# Matches runs of invalid characters and/or whitespace as a single unit;
+# compiled once so each title is cleaned in a single C-level scan instead
+# of a per-character loop
+_SANITIZE = re.compile(r'[^\w\-]+')
+
+def _sanitize_sub(match):
+    # A run containing any whitespace collapses to one space; a run of
+    # pure punctuation is removed outright
+    return ' ' if any(c.isspace() for c in match.group(0)) else ''
 
 def sanitize_filename(title):
     """Create a safe filename from the video title."""
-    # Remove invalid characters
-    filename = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_'))
-    # Remove leading/trailing spaces
-    filename = filename.strip()
-    # Replace multiple spaces with single space
-    filename = re.sub(r'\s+', ' ', filename)
+    filename = _SANITIZE.sub(_sanitize_sub, title).strip()
     return filename or "video"  # Fallback to "video" if filename is empty
 
-def get_video_info(url):
-    """Get video information using yt-dlp."""
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
+# Long-lived extractor instance so its HTTPS connection pool stays warm
+# across calls; a fresh YoutubeDL per call pays the TLS handshake every time.
+# The format listing only needs metadata (id, ext, filesize, resolution), so
+# skip the webpage and player-JS sub-requests entirely — deciphering stream
+# URLs is deferred to the actual download, which does a full extraction.
+_YDL = yt_dlp.YoutubeDL({
+    'quiet': True,
+    'no_warnings': True,
+    'extractor_args': {'youtube': {
+        'player_skip': ['webpage', 'configs', 'js'],
+        'skip': ['hls', 'dash'],
+    }},
+    'youtube_include_dash_manifest': False,
+})
+
+def _get_video_info_uncached(video_id):
+    """Get video information using yt-dlp.
+
+    Extraction errors propagate to the caller so the cached wrapper only
+    ever stores successes — a transient failure must not be replayed for
+    the whole TTL.
+    """
+    url = f"https://youtu.be/{video_id}"
+    info = _YDL.extract_info(url, download=False)
+
+    # The render code only ever needs the {description: format_id} dicts,
+    # so those are the only per-format structures built — one pass, two
+    # dict allocations total, no intermediate per-format objects
+    video_options = {}
+    audio_options = {}
+
+    for f in info['formats']:
+        video_none = f.get('vcodec') == 'none'
+        audio_none = f.get('acodec') == 'none'
+        # Skip formats without video or audio
+        if video_none and audio_none:
+            continue
+
+        filesize = format_size(f['filesize']) if f.get('filesize') else 'N/A'
+
+        # Create a descriptive format string
+        if video_none:
+            description = f"Audio only ({f.get('format_note', '')}) - {filesize}"
+            if not audio_none:
+                audio_options[description] = f['format_id']
+        else:
+            description = f"Video ({f.get('resolution', 'N/A')}) - {filesize}"
+            video_options[description] = f['format_id']
+
+    return {
+        'title': info.get('title', 'Untitled'),
+        'duration': info.get('duration', 0),
+        'video_options': video_options,
+        'audio_options': audio_options,
+        'channel': info.get('uploader', 'Unknown'),
+        'view_count': info.get('view_count', 0),
     }
-    
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            formats = []
-            
-            # Filter and organize formats
-            for f in info['formats']:
-                # Skip formats without video or audio
-                if f.get('vcodec') == 'none' and f.get('acodec') == 'none':
-                    continue
-                    
-                format_info = {
-                    'format_id': f['format_id'],
-                    'ext': f['ext'],
-                    'filesize': format_size(f.get('filesize', 0)) if f.get('filesize') else 'N/A',
-                    'format_note': f.get('format_note', ''),
-                    'vcodec': 'none' if f.get('vcodec') == 'none' else f.get('vcodec', 'N/A'),
-                    'acodec': 'none' if f.get('acodec') == 'none' else f.get('acodec', 'N/A'),
-                    'resolution': f.get('resolution', 'N/A'),
-                }
-                
-                # Create a descriptive format string
-                if f['vcodec'] == 'none':
-                    format_info['description'] = f"Audio only ({format_info['format_note']}) - {format_info['filesize']}"
-                else:
-                    format_info['description'] = f"Video ({format_info['resolution']}) - {format_info['filesize']}"
-                
-                formats.append(format_info)
-            
-            return {
-                'title': info.get('title', 'Untitled'),
-                'duration': info.get('duration', 0),
-                'thumbnail': info.get('thumbnail'),
-                'formats': formats,
-                'channel': info.get('uploader', 'Unknown'),
-                'view_count': info.get('view_count', 0)
-            }
-    except Exception as e:
-        st.error(f"Error extracting video information: {str(e)}")
-        return None
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_video_info(video_id):
+    """Cached video info lookup keyed on the video ID.
+
+    Streamlit reruns the whole script on every widget interaction, so without
+    caching each rerun would trigger a fresh yt-dlp network extraction. With
+    the cache a single fetch serves all reruns until the TTL expires.
+    """
+    return _get_video_info_uncached(video_id)
 
 def download_video(url, save_dir, format_id, is_audio=False):
-    """Download video with specified format."""
+    """Download video with specified format.
+
+    This is the one place that needs a playable (deciphered) stream URL, so
+    it runs a full extraction — the metadata path skips the player JS.
+    """
+    _LAST_UPDATE[:] = [0.0, -1]
     try:
         ydl_opts = {
             'format': format_id,
+            # When the selected format needs separate video+audio streams,
+            # let ffmpeg mux them with stream copy (no re-encode)
+            'merge_output_format': 'mp4',
             'outtmpl': os.path.join(save_dir, '%(title)s.%(ext)s'),
             'progress_hooks': [download_progress_hook],
+            # Parallel fragment fetches for DASH/HLS streams; no-ops for
+            # plain progressive downloads
+            'concurrent_fragment_downloads': 8,
+            'http_chunk_size': 10 * 1024 * 1024,
         }
-        
+
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             ydl.download([url])
         return True
-    except Exception as e:
+    except (yt_dlp.utils.YoutubeDLError, OSError) as e:
         st.error(f"Error downloading video: {str(e)}")
         return False
 
+def download_best(url, save_dir):
+    """Download best video+audio in one shot, with metadata as a side effect.
+
+    One extraction serves both the download and the post-download summary:
+    writeinfojson makes yt-dlp drop a .info.json next to the output, which
+    is read locally instead of making a second metadata round-trip.
+    """
+    _LAST_UPDATE[:] = [0.0, -1]
+    ydl_opts = {
+        'format': 'bv*+ba/b',
+        'merge_output_format': 'mp4',
+        'writeinfojson': True,
+        'outtmpl': os.path.join(save_dir, '%(title)s.%(ext)s'),
+        'progress_hooks': [download_progress_hook],
+        'concurrent_fragment_downloads': 8,
+        'http_chunk_size': 10 * 1024 * 1024,
+    }
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            result = ydl.extract_info(url)
+            # Exact path of the metadata written for this download — no
+            # globbing the shared directory, which races between sessions
+            info_path = ydl.prepare_filename(result, 'infojson')
+    except (yt_dlp.utils.YoutubeDLError, OSError) as e:
+        st.error(f"Error downloading video: {str(e)}")
+        return None
+
+    # A missing or malformed metadata file must not turn an already
+    # successful download into a failure
+    try:
+        with open(info_path, encoding='utf-8') as f:
+            info = json.load(f)
+        os.remove(info_path)
+    except (OSError, ValueError):
+        info = {}
+    return {
+        'title': info.get('title', 'Untitled'),
+        'channel': info.get('uploader', 'Unknown'),
+        'view_count': info.get('view_count', 0),
+    }
+
+# [last update time, last reported percent] — debounce state for the hook
+_LAST_UPDATE = [0.0, -1]
+
 def download_progress_hook(d):
-    """Progress hook for downloads."""
+    """Progress hook for downloads, throttled to at most 10 updates/sec.
+
+    yt-dlp fires this on every chunk read, and each progress() call is a
+    full widget rerender over Streamlit's WebSocket; only push an update
+    when the integer percent changed and 100ms have passed.
+    """
     if d['status'] == 'downloading':
-        try:
-            total = d.get('total_bytes', 0) or d.get('total_bytes_estimate', 0)
-            downloaded = d.get('downloaded_bytes', 0)
-            if total:
-                progress = (downloaded / total) * 100
+        # No try/except here: every access uses .get() with a default, and
+        # setting up an exception handler per chunk is pure overhead
+        total = d.get('total_bytes', 0) or d.get('total_bytes_estimate', 0)
+        downloaded = d.get('downloaded_bytes', 0)
+        if total:
+            # total_bytes_estimate can undershoot, so downloaded/total may
+            # exceed 1 — and st.progress raises on values above 100
+            pct = min(int((downloaded / total) * 100), 100)
+            now = time.monotonic()
+            # 100% always goes through, or the bar could stick just below
+            # full when the last chunk lands inside the debounce window
+            if pct != _LAST_UPDATE[1] and (pct == 100 or (now - _LAST_UPDATE[0]) > 0.1):
+                _LAST_UPDATE[:] = [now, pct]
                 if 'progress_bar' in st.session_state:
-                    st.session_state.progress_bar.progress(int(progress))
-        except:
-            pass
+                    st.session_state.progress_bar.progress(pct)
+    elif d['status'] == 'finished':
+        _LAST_UPDATE[:] = [0.0, -1]
+        if 'progress_bar' in st.session_state:
+            st.session_state.progress_bar.progress(100)
 
 def main():
     st.set_page_config(page_title="YouTube Video Downloader", page_icon="🎥")
@@ -141,10 +239,6 @@ def main():
     st.title("🎥 YouTube Video Downloader")
     st.markdown("---")
     
-    # Create downloads directory
-    downloads_dir = os.path.join(os.getcwd(), "downloads")
-    os.makedirs(downloads_dir, exist_ok=True)
-    
     # URL input
     video_url = st.text_input("🔗 Enter YouTube URL:", placeholder="https://www.youtube.com/watch?v=...")
     
@@ -156,20 +250,44 @@ def main():
                 st.error("❌ Invalid YouTube URL. Please enter a valid YouTube video URL.")
                 return
 
-            # Get video information
-            info = get_video_info(video_url)
-            if not info:
+            # Nothing is extracted until the user picks a path, so pasting
+            # a URL costs no network round-trip at all
+            quick_col, preview_col = st.columns(2)
+
+            # Fast path: one combined extract+download, no separate preview
+            # fetch — the info.json written alongside supplies the summary
+            if quick_col.button("⚡ Quick Download (best quality)"):
+                st.session_state.progress_bar = st.progress(0)
+                with st.spinner("Downloading..."):
+                    result = download_best(video_url, _DOWNLOADS_DIR)
+                if result is not None:
+                    st.success(f"✅ Successfully downloaded {result.get('title', 'video')}!")
                 return
-            
+
+            # Remember which video the preview was requested for: a button
+            # press only survives its own rerun, but the preview has to stay
+            # up across the format-selection interactions that follow
+            if preview_col.button("🔍 Preview formats"):
+                st.session_state.preview_video_id = video_id
+            if st.session_state.get('preview_video_id') != video_id:
+                return
+
+            # Get video information (cached across reruns; only successes
+            # are cached, so a transient failure can be retried immediately)
+            try:
+                info = get_video_info(video_id)
+            except (yt_dlp.utils.YoutubeDLError, OSError) as e:
+                st.error(f"Error extracting video information: {str(e)}")
+                return
+
             # Show video information
             col1, col2 = st.columns([1, 2])
             with col1:
-                if info.get('thumbnail'):
-                    st.image(info['thumbnail'], use_container_width=True)
-                else:
-                    thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
-                    st.image(thumbnail_url, use_container_width=True)
-                    
+                # This endpoint exists for every public video, so the
+                # thumbnail never needs to come from the extracted info
+                thumbnail_url = f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
+                st.image(thumbnail_url, use_container_width=True)
+
             with col2:
                 st.subheader(info['title'])
                 st.write(f"👤 **Channel:** {info['channel']}")
@@ -182,17 +300,12 @@ def main():
             
             st.markdown("---")
             
-            # Create format selection options
-            video_formats = [f for f in info['formats'] if f['vcodec'] != 'none']
-            audio_formats = [f for f in info['formats'] if f['vcodec'] == 'none' and f['acodec'] != 'none']
-
-            # Format selection
+            # Format selection (option dicts were built during extraction)
             format_type = st.radio("Select format type:", ["Video", "Audio only"])
-            
             if format_type == "Video":
-                format_options = {f['description']: f['format_id'] for f in video_formats}
+                format_options = info['video_options']
             else:
-                format_options = {f['description']: f['format_id'] for f in audio_formats}
+                format_options = info['audio_options']
 
             selected_format_desc = st.selectbox(
                 "Select quality:",
@@ -211,8 +324,8 @@ def main():
                     st.session_state.progress_bar = st.progress(0)
                     with st.spinner("Downloading..."):
                         success = download_video(
-                            video_url, 
-                            save_dir, 
+                            video_url,
+                            save_dir,
                             selected_format_id,
                             is_audio=(format_type == "Audio only")
                         )
@@ -222,14 +335,14 @@ def main():
                     else:
                         st.error("❌ Download failed. Please try again.")
                         
-                except Exception as e:
+                except (yt_dlp.utils.DownloadError, OSError) as e:
                     st.error(f"❌ Error: {str(e)}")
                     st.info("💡 Tips:\n"
                            "- Make sure the video exists and is not private\n"
                            "- Check your internet connection\n"
                            "- Try refreshing the page")
-                    
-        except Exception as e:
+
+        except (yt_dlp.utils.DownloadError, KeyError, OSError) as e:
             st.error(f"❌ Error: {str(e)}")
             st.info("💡 Tips:\n"
                    "- Make sure the video exists and is not private\n"